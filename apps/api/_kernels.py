@@ -0,0 +1,144 @@
+"""
+Compiled inner loops for the walk-forward engine.
+
+Numba is optional: when it is not installed `njit` degrades to a no-op decorator and the
+kernels run as plain Python/NumPy with identical results.
+"""
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        # support both @njit and @njit(...)
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def _rebalance(px_arr, t, lookback, k, weights, mom, taken, sel_row):
+    """
+    Replace `weights` in place with the equal-weight top-k basket by `lookback` return at row t
+    (all zeros without enough history), writing the picks best-first into sel_row.
+    Returns the turnover of the switch.
+    """
+    N = px_arr.shape[1]
+    turnover = 0.0
+    if t >= lookback and k > 0:
+        for j in range(N):
+            mom[j] = px_arr[t, j] / px_arr[t - lookback, j] - 1.0
+        if k == 1:
+            # default top_k: one argmax pass, the basket is a one-hot vector
+            best = 0
+            for j in range(1, N):
+                if mom[j] > mom[best]:
+                    best = j
+            sel_row[0] = best
+            for j in range(N):
+                w = 1.0 if j == best else 0.0
+                turnover += abs(w - weights[j])
+                weights[j] = w
+            return turnover
+        # partial selection sort: k passes of a linear scan (N is small)
+        for j in range(N):
+            taken[j] = False
+        for s in range(k):
+            best = -1
+            for j in range(N):
+                if not taken[j] and (best < 0 or mom[j] > mom[best]):
+                    best = j
+            taken[best] = True
+            sel_row[s] = best
+        for j in range(N):
+            w = 1.0 / k if taken[j] else 0.0
+            turnover += abs(w - weights[j])
+            weights[j] = w
+    else:
+        for j in range(N):
+            turnover += abs(weights[j])
+            weights[j] = 0.0
+    return turnover
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def simulate(px_arr, rets_arr, rebalance_days, lookback, top_k, fee):
+    """
+    Top-k momentum simulation over a (T, N) price matrix and its daily returns
+    (rets_arr[t] is the return from row t-1 to row t; row 0 is not used).
+    Every `rebalance_days` (starting at row 0) the top_k assets by `lookback` return are
+    equal-weighted; turnover is charged `fee` (a fraction, not bps) before that day's return.
+    Returns: equity (T,), turnover (T,) and the selected column indices per rebalance
+    (R, top_k), best first, -1 where there was not enough history.
+    """
+    T, N = px_arr.shape
+    k = min(top_k, N)
+    n_rebal = (T + rebalance_days - 1) // rebalance_days
+
+    eq_arr = np.empty(T)
+    turnover_arr = np.zeros(T)
+    sel_arr = np.full((n_rebal, max(k, 0)), -1, np.int64)
+
+    weights = np.zeros(N)
+    mom = np.empty(N)
+    taken = np.zeros(N, np.bool_)
+    eq = 1.0
+
+    for t in range(T):
+        if t % rebalance_days == 0:
+            turnover = _rebalance(px_arr, t, lookback, k, weights, mom, taken, sel_arr[t // rebalance_days])
+            turnover_arr[t] = turnover
+            eq *= 1.0 - turnover * fee
+
+        if t > 0:
+            rp = 0.0
+            for j in range(N):
+                rp += weights[j] * rets_arr[t, j]
+            eq *= 1.0 + rp
+        eq_arr[t] = eq
+
+    return eq_arr, turnover_arr, sel_arr
+
+
+@njit(cache=True, fastmath=True, nogil=True)
+def train_sharpe(px_arr, rets_arr, rebalance_days, lookback, top_k, fee):
+    """
+    Annualised Sharpe (ddof=1) of the daily equity returns `simulate` would produce from row 1
+    on, accumulated in one Welford pass without materialising the equity curve or trade picks.
+    Returns -1e9 when the returns have zero variance (e.g. never invested).
+    """
+    T, N = px_arr.shape
+    k = min(top_k, N)
+
+    weights = np.zeros(N)
+    mom = np.empty(N)
+    taken = np.zeros(N, np.bool_)
+    sel_row = np.empty(max(k, 0), np.int64)
+
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for t in range(T):
+        cost = 0.0
+        if t % rebalance_days == 0:
+            cost = _rebalance(px_arr, t, lookback, k, weights, mom, taken, sel_row) * fee
+        if t > 0:
+            rp = 0.0
+            for j in range(N):
+                rp += weights[j] * rets_arr[t, j]
+            # eq[t] / eq[t-1] - 1
+            g = (1.0 - cost) * (1.0 + rp) - 1.0
+            n += 1
+            d = g - mean
+            mean += d / n
+            m2 += d * (g - mean)
+
+    if n < 2:
+        return np.nan
+    sd = np.sqrt(m2 / (n - 1))
+    if sd == 0.0:
+        return -1e9
+    return mean / sd * np.sqrt(252.0)
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from pathlib import Path
-import json
+import orjson
 import pandas as pd
 import math
 
@@ -24,7 +24,7 @@ def analyze_run(rdir: Path) -> None:
     equity_csv = rdir / "equity.csv"
     windows_csv = rdir / "walkforward_windows.csv"
 
-    run = json.loads(run_json.read_text())
+    run = orjson.loads(run_json.read_bytes())
     p = run.get("params", {}) or {}
 
     params = Params(
@@ -39,7 +39,7 @@ def analyze_run(rdir: Path) -> None:
         fee_bps=float(p.get("fee_bps", 5)),
     )
 
-    params_used.write_text(json.dumps(params.__dict__, indent=2))
+    params_used.write_bytes(orjson.dumps(params.__dict__, option=orjson.OPT_INDENT_2))
 
     out = run_walkforward(params)
 
@@ -1,9 +1,9 @@
-import json
 import time
 import uuid
 from pathlib import Path
 from typing import Any, Dict
 
+import orjson
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
@@ -41,12 +41,15 @@ def _run_dir(run_id: str) -> Path:
     return RUNS_DIR / run_id
 
 
+_JSON_OPTS = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
 def _write_json(path: Path, obj: Any) -> None:
-    path.write_text(json.dumps(obj, indent=2, default=str))
+    path.write_bytes(orjson.dumps(obj, option=_JSON_OPTS, default=str))
 
 
 def _read_json(path: Path) -> Any:
-    return json.loads(path.read_text())
+    return orjson.loads(path.read_bytes())
 
 
 @app.get("/health")
@@ -148,7 +151,7 @@ def start(run_id: str):
 
         # artifacts
         _write_json(rdir / "params_used.json", params_used.__dict__)
-        (rdir / "lean_results.json").write_text(json.dumps(result["payload"]))
+        (rdir / "lean_results.json").write_bytes(orjson.dumps(result["payload"]))
         result["windows"].to_csv(rdir / "walkforward_windows.csv", index=False)
         result["trades"].to_csv(rdir / "trades.csv", index=False)
 
@@ -0,0 +1,78 @@
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = ".cache"
+PANEL_CACHE_SIZE = 8
+
+def read_close(p: Path) -> pd.DataFrame:
+    """
+    Read the Date and Close columns of a Stooq daily CSV (Date parsed, Close float64).
+    Rows whose Date does not parse are dropped.
+    The parsed frame is cached as parquet in <data_dir>/.cache and reused while it is at
+    least as new as the CSV, so re-fetching a ticker invalidates its cache.
+    Raises ValueError if the file does not have Date and Close columns.
+    """
+    cache = p.parent / CACHE_DIR / f"{p.stem}.parquet"
+    if cache.exists() and cache.stat().st_mtime_ns >= p.stat().st_mtime_ns:
+        return pd.read_parquet(cache)
+
+    try:
+        df = pd.read_csv(p, usecols=["Date", "Close"], dtype={"Date": str, "Close": "float64"})
+    except ValueError as e:
+        raise ValueError(f"Bad CSV format: {p}") from e
+    df["Date"] = pd.to_datetime(df["Date"], format="%Y-%m-%d", errors="coerce")
+    df = df.dropna(subset=["Date"]).reset_index(drop=True)
+
+    # write to a temp file and rename, so concurrent runs never read a half-written cache
+    try:
+        cache.parent.mkdir(exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=cache.parent, suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, cache)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError:
+        pass  # read-only data dir: skip caching
+    return df
+
+def align_closes(names: list[str], frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Outer-join read_close frames on Date into one (T, N) panel named by `names`, NaN where a
+    ticker has no row. Each Close column is scattered into a preallocated array at its
+    searchsorted positions in the sorted union of dates, so no per-ticker frames are concatenated.
+    """
+    dates = [df["Date"].to_numpy() for df in frames]
+    # sorted and de-duplicated even for a single ticker whose CSV is not in date order
+    master = np.unique(np.concatenate(dates))
+    out = np.full((len(master), len(frames)), np.nan)
+    for j, (d, df) in enumerate(zip(dates, frames)):
+        out[np.searchsorted(master, d), j] = df["Close"].to_numpy(dtype=float)
+    return pd.DataFrame(out, index=pd.DatetimeIndex(master, name="Date"), columns=names)
+
+@lru_cache(maxsize=PANEL_CACHE_SIZE)
+def _load_panel(paths: tuple[Path, ...], names: tuple[str, ...], mtimes: tuple[int, ...]) -> pd.DataFrame:
+    # mtimes is only part of the key: rewriting a CSV misses, and the stale entry ages out
+    frames = []
+    for name, p in zip(names, paths):
+        try:
+            frames.append(read_close(p))
+        except ValueError as e:
+            raise ValueError(f"Bad CSV format for {name}: {p}") from e
+    return align_closes(list(names), frames)
+
+def load_panel(paths: list[Path], names: list[str]) -> pd.DataFrame:
+    """
+    align_closes panel of the CSVs at `paths`, memoized (the last PANEL_CACHE_SIZE ticker sets)
+    until one of the files is rewritten. The frame is shared between calls, so callers must
+    not modify it in place. Raises ValueError naming the ticker whose CSV is malformed.
+    """
+    mtimes = tuple(p.stat().st_mtime_ns for p in paths)
+    return _load_panel(tuple(paths), tuple(names), mtimes)
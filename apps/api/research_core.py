@@ -5,6 +5,8 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from prices import load_panel
+
 DATA_DIR = Path("/app/data")
 
 @dataclass
@@ -20,37 +22,58 @@ class Params:
     fee_bps: float
 
 def load_prices(tickers: list[str]) -> pd.DataFrame:
-    dfs = []
+    paths = []
     for t in tickers:
         p = DATA_DIR / f"{t.upper()}.csv"
         if not p.exists():
             raise FileNotFoundError(f"Missing data file: {p}. Run scripts/fetch_stooq.")
-        df = pd.read_csv(p)
-        if "Date" not in df.columns or "Close" not in df.columns:
-            raise ValueError(f"Bad CSV schema in {p}. Need Date and Close.")
-        df["Date"] = pd.to_datetime(df["Date"], utc=True, errors="coerce")
-        df = df.dropna(subset=["Date"]).sort_values("Date")
-        df = df[["Date", "Close"]].rename(columns={"Close": t.upper()}).set_index("Date")
-        dfs.append(df)
-    px = pd.concat(dfs, axis=1).dropna(how="any")
+        paths.append(p)
+
+    try:
+        px = load_panel(paths, [t.upper() for t in tickers])
+    except ValueError as e:
+        raise ValueError(f"{e}. Need Date and Close.") from e
+    px = px.dropna(how="any")
+    px.index = px.index.tz_localize("UTC")
     return px
 
-def daily_returns(px: pd.DataFrame) -> pd.DataFrame:
-    rets = px.pct_change().dropna(how="any")
-    return rets
-
-def momentum_scores(px: pd.DataFrame, lookback: int) -> pd.DataFrame:
-    # simple total return over lookback
-    return px.pct_change(lookback)
-
-def sharpe(x: pd.Series) -> float:
-    x = x.dropna()
+def momentum_stack(px_arr: np.ndarray, lookbacks: list[int]) -> np.ndarray:
+    # total return over each lookback of a (T, N) price matrix: (len(lookbacks), T, N), NaN-padded
+    out = np.full((len(lookbacks),) + px_arr.shape, np.nan)
+    for k, lb in enumerate(lookbacks):
+        out[k, lb:] = px_arr[lb:] / px_arr[:-lb] - 1.0
+    return out
+
+def basket_weights(scores: np.ndarray, rebalance_days: int, top_k: int) -> np.ndarray:
+    # every rebalance_days rows pick the top_k by score (1/top_k each) and hold only that basket
+    # until the next rebalance; dropped assets go back to zero weight
+    w = np.zeros(scores.shape)
+    k = min(top_k, scores.shape[1])
+    if k <= 0:
+        return w
+    for i in range(0, len(scores), rebalance_days):
+        row = scores[i]
+        if np.isnan(row).any():
+            # not enough history: match nlargest, where NaN ranks last and ties keep column order
+            top = np.argsort(-np.where(np.isnan(row), -np.inf, row), kind="stable")[:k]
+        elif k == 1:
+            # default top_k: a single argmax (first column wins ties, like nlargest)
+            top = np.argmax(row)
+        else:
+            # O(N) partial selection instead of a full sort
+            top = np.argpartition(-row, k - 1)[:k]
+        w[i:i + rebalance_days, top] = 1.0 / top_k
+    return w
+
+def sharpe(x: np.ndarray | pd.Series) -> float:
+    x = np.asarray(x, dtype=float)
+    x = x[~np.isnan(x)]
     if len(x) < 10:
         return float("-inf")
-    sd = x.std()
+    sd = x.std(ddof=1)
     if sd == 0 or np.isnan(sd):
         return float("-inf")
-    return (x.mean() / sd) * np.sqrt(252)
+    return float((x.mean() / sd) * np.sqrt(252))
 
 def run_walkforward(params: Params) -> dict:
     px = load_prices(params.tickers)
@@ -58,11 +81,21 @@ def run_walkforward(params: Params) -> dict:
     if len(px) < params.train_days + params.test_days + 5:
         raise ValueError("Not enough price history for given start/end/train/test.")
 
-    rets = daily_returns(px)
+    # returns as a plain C-contiguous array (window slices are contiguous row blocks),
+    # aligned with dates = px.index[1:]
+    px_arr = np.ascontiguousarray(px.to_numpy(dtype=np.float64))
+    rets_arr = px_arr[1:] / px_arr[:-1] - 1.0
 
-    dates = rets.index
-    eq = pd.Series(index=dates, dtype=float)
-    eq.iloc[0] = 1.0
+    dates = px.index[1:]
+    # equity starts at 1.0 on the first date; test windows are appended and joined once
+    eq_parts = [np.ones(1)]
+    date_parts = [dates[:1]]
+    prev_eq = 1.0
+
+    # momentum is computed once per lookback and sliced per window;
+    # drop the first price row to align with rets_arr
+    mom = momentum_stack(px_arr, params.lookbacks)[:, 1:]
+    lb_pos = {lb: k for k, lb in enumerate(params.lookbacks)}
 
     rows = []
     t0 = 0
@@ -83,38 +116,25 @@ def run_walkforward(params: Params) -> dict:
         best_sh = float("-inf")
 
         for lb in params.lookbacks:
-            scores = momentum_scores(px, lb).loc[dates[train_slice]]
-            # rebalance every N days: forward-fill chosen basket weights between rebals
-            w = pd.DataFrame(0.0, index=scores.index, columns=scores.columns)
-            for i, dt in enumerate(scores.index):
-                if i % params.rebalance_days == 0:
-                    top = scores.loc[dt].nlargest(params.top_k).index.tolist()
-                    w.loc[dt, top] = 1.0 / params.top_k
-            w = w.replace(0, np.nan).ffill().fillna(0.0)
-
-            rp = (w * rets.loc[w.index]).sum(axis=1) - fee
+            # rebalance every N days: hold the chosen basket between rebals
+            w = basket_weights(mom[lb_pos[lb], train_slice], params.rebalance_days, params.top_k)
+
+            # row-wise dot of weights and returns in one sweep
+            rp = np.einsum("tn,tn->t", w, rets_arr[train_slice]) - fee
             sh = sharpe(rp)
             if sh > best_sh:
                 best_sh, best_lb = sh, lb
 
         # apply best lookback on test
-        scores = momentum_scores(px, best_lb).loc[dates[test_slice]]
-        w = pd.DataFrame(0.0, index=scores.index, columns=scores.columns)
-        for i, dt in enumerate(scores.index):
-            if i % params.rebalance_days == 0:
-                top = scores.loc[dt].nlargest(params.top_k).index.tolist()
-                w.loc[dt, top] = 1.0 / params.top_k
-        w = w.replace(0, np.nan).ffill().fillna(0.0)
-
-        rp = (w * rets.loc[w.index]).sum(axis=1) - fee
+        w = basket_weights(mom[lb_pos[best_lb], test_slice], params.rebalance_days, params.top_k)
 
-        # chain equity
-        prev_eq = float(eq.loc[w.index[0] - pd.Timedelta(days=1)] if (w.index[0] - pd.Timedelta(days=1)) in eq.index else eq.iloc[train_end-1])
-        # safer: use last known equity before test starts
-        prev_eq = float(eq.ffill().iloc[train_end-1])
+        rp = np.einsum("tn,tn->t", w, rets_arr[test_slice]) - fee
 
-        test_eq = (1.0 + rp).cumprod() * prev_eq
-        eq.loc[test_eq.index] = test_eq
+        # chain equity from the last known value before the test starts
+        test_eq = np.cumprod(1.0 + rp) * prev_eq
+        eq_parts.append(test_eq)
+        date_parts.append(dates[test_slice])
+        prev_eq = float(test_eq[-1])
 
         rows.append({
             "train_start": str(dates[train_start].date()),
@@ -127,7 +147,7 @@ def run_walkforward(params: Params) -> dict:
 
         t0 = test_end  # roll forward by test window
 
-    eq = eq.dropna()
+    eq = pd.Series(np.concatenate(eq_parts), index=date_parts[0].append(date_parts[1:]))
     r = eq.pct_change().dropna()
 
     # metrics
@@ -1,6 +1,7 @@
 import sys
 import ssl
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import certifi
@@ -42,6 +43,7 @@ if __name__ == "__main__":
         raise SystemExit(2)
 
     out_dir = Path("data")
-    for sym in sys.argv[1:]:
-        p = fetch(sym, out_dir)
-        print(f"saved {p}")
+    # downloads are latency-bound, so fetch all tickers concurrently (results print in order)
+    with ThreadPoolExecutor(max_workers=8) as ex:
+        for p in ex.map(lambda sym: fetch(sym, out_dir), sys.argv[1:]):
+            print(f"saved {p}")